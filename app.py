@@ -1,33 +1,124 @@
 import os
+import sys
+import hashlib
 import logging
-from flask import Flask, render_template, request, session, redirect, url_for, Response
-from calculator import RealEstateCalculator
+import tempfile
+from functools import lru_cache
+from flask import Flask, render_template, request, session, redirect, url_for, Response, jsonify
+from markupsafe import Markup
+from calculator import SCENARIO_DEFINITIONS, RealEstateCalculator, parse_scenario_definitions
+from market_data import get_market_index
+from input_decoder import DecodeError, decode_form, iter_listing_chunks, parse_form_number
 from translations import get_translations
 from pdf_generator import generate_pdf_report
+from assets import FingerprintedAssets, load_asset_manifest
+from render_cache import cache_key, make_render_cache
+from spreadsheet_export import SECTIONS, listing_errors, listing_properties, stream_export
 
 logging.basicConfig(level=logging.DEBUG)
 
 app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key-change-in-production")
+app.wsgi_app = FingerprintedAssets(app.wsgi_app)
+
+EXPORT_MIMETYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+LISTING_EXTENSIONS = ('.csv', '.xlsx', '.xlsm')
+
+RESULTS_TEMPLATE = '_results.html'
+# The disk cache is served as trusted HTML, so it lives in a directory only the app owns.
+RENDER_CACHE_DIR = os.environ.get('RENDER_CACHE_DIR') or os.path.join(app.instance_path, 'render-cache')
+render_cache = make_render_cache(os.environ.get('RENDER_CACHE', 'memory'),
+                                 directory=RENDER_CACHE_DIR,
+                                 max_entries=int(os.environ.get('RENDER_CACHE_SIZE', 256)),
+                                 ttl=int(os.environ.get('RENDER_CACHE_TTL', 3600)))
+
+PERCENT_METRICS = ('net_yield', 'cap_rate', 'irr')
+SCENARIO_LABELS = {'base': 'base_scenario', 'best': 'best_case', 'worst': 'worst_case'}
 
 USERNAME = os.environ.get('ADMIN_USERNAME', 'movenest')
 PASSWORD = os.environ.get('ADMIN_PASSWORD', 'paris2025')
 
 
-def safe_float(value, default=0.0):
-    try:
-        return float(str(value).replace(',', '').strip())
-    except (ValueError, TypeError):
-        return default
+@app.url_defaults
+def fingerprint_static_urls(endpoint, values):
+    # Point url_for('static', ...) at the built, content-hashed copy when there is one.
+    if endpoint == 'static' and 'filename' in values:
+        values['filename'] = load_asset_manifest().get(values['filename'], values['filename'])
+
+
+@app.template_filter('format_metric')
+def format_metric(value, key):
+    if key in PERCENT_METRICS:
+        return f"{value:.2f}%"
+    if key == 'dscr':
+        return f"{value:.2f}"
+    return f"{value:,.0f} €"
+
+
+def scenario_payload(scenarios, translations):
+    """Preformatted results for every scenario, embedded in the page for client-side switching."""
+    return {name: {'label': translations.get(SCENARIO_LABELS.get(name), name),
+                   'metrics': {key: format_metric(value, key)
+                               for key, value in scenario['results'].items() if key != 'npv_over_time'},
+                   'npv_over_time': scenario['results']['npv_over_time'],
+                   'interpretations': scenario['interpretations']}
+            for name, scenario in scenarios.items()}
+
+
+@lru_cache(maxsize=None)
+def results_template_version():
+    source, _, _ = app.jinja_loader.get_source(app.jinja_env, RESULTS_TEMPLATE)
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+
+@lru_cache(maxsize=None)
+def results_code_version():
+    """Hash of the modules whose numbers and labels end up in the fragment, so a deploy invalidates it."""
+    digest = hashlib.sha256()
+    for name in (__name__, 'calculator', 'translations', 'market_data'):
+        with open(sys.modules[name].__file__, 'rb') as module_file:
+            digest.update(module_file.read())
+    return digest.hexdigest()
 
-def safe_int(value, default=0):
-    try:
-        return int(str(value).replace(',', '').strip())
-    except (ValueError, TypeError):
-        return default
 
-def is_loan_enabled(value):
-    return str(value).strip().lower() in ["yes", "oui", "true", "on", "1"]
+def render_results(calculator, definitions, scenario_type, language, translations, market_warnings):
+    scenarios = calculator.calculate_scenarios(definitions, language)
+    return render_template(RESULTS_TEMPLATE,
+                           translations=translations,
+                           results=scenarios[scenario_type]['results'],
+                           base_results=scenarios['base']['results'],
+                           interpretations=scenarios[scenario_type]['interpretations'],
+                           scenario_type=scenario_type,
+                           scenario_payload=scenario_payload(scenarios, translations),
+                           market_warnings=market_warnings)
+
+
+def apply_market_reference(form_data, translations):
+    """Fill blank price/rent/charges/taxe fields from the market index and flag outliers."""
+    market = get_market_index()
+    arrondissement = form_data.get('arrondissement')
+    surface = parse_form_number(form_data, 'surface')
+    if market is None or not arrondissement or surface <= 0:
+        return form_data, []
+    reference = market.reference_values(arrondissement, surface, form_data.get('quartier', ''))
+    if reference is None:
+        return form_data, []
+
+    form_data = dict(form_data)
+    for field, value in reference.items():
+        if not str(form_data.get(field, '')).strip():
+            form_data[field] = f"{value:.0f}"
+
+    values = {field: parse_form_number(form_data, field) for field in reference}
+    warnings = market.check_inputs(arrondissement, surface, values, form_data.get('quartier', ''))
+    messages = [translations['market_outlier'].format(label=translations[w['field']],
+                                                      value=w['value'],
+                                                      reference=w['reference'])
+                for w in warnings]
+    return form_data, messages
 
 
 @app.route('/login', methods=['GET', 'POST'])
@@ -68,52 +159,62 @@ def index():
                            form_data=form_data)
 
 
+@app.route('/market_reference')
+def market_reference():
+    market = get_market_index()
+    if market is None:
+        return jsonify({'error': 'market data unavailable'}), 503
+    arrondissement = request.args.get('arrondissement')
+    quartier = request.args.get('quartier', '')
+    reference = market.lookup(arrondissement, quartier)
+    if reference is None:
+        return jsonify({'error': 'unknown zone'}), 404
+    surface = parse_form_number(request.args, 'surface')
+    return jsonify({'version': market.version,
+                    'per_m2': reference,
+                    'defaults': market.reference_values(arrondissement, surface, quartier) if surface > 0 else None})
+
+
 @app.route('/calculate', methods=['POST'])
 def calculate():
-    form_data = request.form.to_dict()
-    session['form_data'] = form_data
     language = session.get('language', 'fr')
     translations = get_translations(language)
+    form_data, market_warnings = apply_market_reference(request.form.to_dict(), translations)
+    session['form_data'] = form_data
     scenario_type = form_data.get('scenario', 'base')
     try:
-        calculator = RealEstateCalculator(
-            property_price=safe_float(form_data.get('property_price')),
-            notary_rate=safe_float(form_data.get('notary_rate')) / 100,
-            renovation_budget=safe_float(form_data.get('renovation_budget')),
-            monthly_rent=safe_float(form_data.get('monthly_rent')),
-            vacancy_months=safe_float(form_data.get('vacancy_months')),
-            annual_charges=safe_float(form_data.get('annual_charges')),
-            taxe_fonciere=safe_float(form_data.get('taxe_fonciere')),
-            annual_capex=safe_float(form_data.get('annual_capex')),
-            resale_value=safe_float(form_data.get('resale_value')),
-            discount_rate=safe_float(form_data.get('discount_rate')) / 100,
-            use_loan=is_loan_enabled(form_data.get('use_loan')),
-            loan_amount=safe_float(form_data.get('loan_amount')),
-            interest_rate=safe_float(form_data.get('interest_rate')) / 100,
-            loan_duration=safe_int(form_data.get('loan_duration')),
-            annual_rent_increase=safe_float(form_data.get('annual_rent_increase')) / 100,
-            annual_charges_increase=safe_float(form_data.get('annual_charges_increase')) / 100
-        )
-
-        if scenario_type in ['best', 'worst']:
-            results = calculator.calculate_scenario(scenario_type)
-            base_results = calculator.calculate_all_metrics()
-        else:
-            results = calculator.calculate_all_metrics()
-            base_results = results
+        calculator_inputs = decode_form(form_data)
+        definitions = {**SCENARIO_DEFINITIONS, **parse_scenario_definitions(form_data.get('custom_scenarios'))}
+        if scenario_type not in definitions:
+            scenario_type = 'base'
 
-        interpretations = calculator.get_interpretations(language)
+        # Resubmitting the same property skips both the calculation and the fragment rendering.
+        key = cache_key(inputs=calculator_inputs,
+                        scenarios=definitions,
+                        scenario=scenario_type,
+                        language=language,
+                        market_warnings=market_warnings,
+                        template=results_template_version(),
+                        code=results_code_version())
+        results_html = render_cache.get(key)
+        if results_html is None:
+            results_html = render_results(RealEstateCalculator(**calculator_inputs), definitions,
+                                          scenario_type, language, translations, market_warnings)
+            render_cache.set(key, results_html)
 
         return render_template('index.html',
                                translations=translations,
                                language=language,
                                form_data=form_data,
-                               results=results,
-                               base_results=base_results,
-                               interpretations=interpretations,
-                               show_results=True,
-                               scenario_type=scenario_type,
-                               calculator=calculator)
+                               results_html=Markup(results_html),
+                               show_results=True)
+    except DecodeError as e:
+        fields = ', '.join(translations.get(field, field) for _, field, _ in e.errors)
+        return render_template('index.html',
+                               translations=translations,
+                               language=language,
+                               form_data=form_data,
+                               error=translations['error_invalid_fields'].format(fields=fields))
     except Exception as e:
         logging.error(f"Calculation error: {e}")
         return render_template('index.html',
@@ -123,6 +224,11 @@ def calculate():
                                error=translations['error_invalid_input'])
 
 
+@app.route('/cache_stats')
+def cache_stats():
+    return jsonify(render_cache.stats())
+
+
 @app.route('/toggle_language')
 def toggle_language():
     current_language = session.get('language', 'fr')
@@ -137,24 +243,7 @@ def export_pdf():
     if not form_data:
         return redirect(url_for('index'))
     try:
-        calculator = RealEstateCalculator(
-            property_price=safe_float(form_data.get('property_price')),
-            notary_rate=safe_float(form_data.get('notary_rate')) / 100,
-            renovation_budget=safe_float(form_data.get('renovation_budget')),
-            monthly_rent=safe_float(form_data.get('monthly_rent')),
-            vacancy_months=safe_float(form_data.get('vacancy_months')),
-            annual_charges=safe_float(form_data.get('annual_charges')),
-            taxe_fonciere=safe_float(form_data.get('taxe_fonciere')),
-            annual_capex=safe_float(form_data.get('annual_capex')),
-            resale_value=safe_float(form_data.get('resale_value')),
-            discount_rate=safe_float(form_data.get('discount_rate')) / 100,
-            use_loan=is_loan_enabled(form_data.get('use_loan')),
-            loan_amount=safe_float(form_data.get('loan_amount')),
-            interest_rate=safe_float(form_data.get('interest_rate')) / 100,
-            loan_duration=safe_int(form_data.get('loan_duration')),
-            annual_rent_increase=safe_float(form_data.get('annual_rent_increase')) / 100,
-            annual_charges_increase=safe_float(form_data.get('annual_charges_increase')) / 100
-        )
+        calculator = RealEstateCalculator(**decode_form(form_data))
         results = calculator.calculate_all_metrics()
         interpretations = calculator.get_interpretations(language)
         pdf_data = generate_pdf_report(results, interpretations, form_data, calculator, language)
@@ -166,5 +255,71 @@ def export_pdf():
         return redirect(url_for('index'))
 
 
+@app.route('/export/<fmt>')
+def export_spreadsheet(fmt):
+    form_data = session.get('form_data', {})
+    language = session.get('language', 'fr')
+    section = request.args.get('section', 'metrics')
+    if not form_data or fmt not in EXPORT_MIMETYPES or section not in SECTIONS:
+        return redirect(url_for('index'))
+    try:
+        calculator = RealEstateCalculator(**decode_form(form_data))
+        # Calculate before streaming: once the body starts the 200 is already sent.
+        metrics = calculator.calculate_all_metrics()
+    except Exception as e:
+        logging.error(f"Spreadsheet export error: {e}")
+        return redirect(url_for('index'))
+
+    market = get_market_index()
+    reference = market.reference_values(form_data.get('arrondissement'),
+                                        parse_form_number(form_data, 'surface'),
+                                        form_data.get('quartier', '')) if market else None
+    extra = {'market_rent': reference['monthly_rent'] if reference else None, 'metrics': metrics}
+    body = stream_export(fmt, get_translations(language),
+                         properties=lambda: [(form_data.get('reference') or 1, calculator, extra)],
+                         section=section)
+    filename = f"movenest_analysis.{fmt}" if fmt == 'xlsx' else f"movenest_{section}.csv"
+    return Response(body,
+                    mimetype=EXPORT_MIMETYPES[fmt],
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+
+@app.route('/export_batch/<fmt>', methods=['POST'])
+def export_batch(fmt):
+    upload = request.files.get('listings')
+    section = request.form.get('section', 'metrics')
+    extension = os.path.splitext(upload.filename or '')[1].lower() if upload else ''
+    if fmt not in EXPORT_MIMETYPES or section not in SECTIONS or extension not in LISTING_EXTENSIONS:
+        return redirect(url_for('index'))
+
+    # The upload is spooled to disk and re-read per sheet, so memory stays flat whatever its size.
+    handle, path = tempfile.mkstemp(suffix=extension)
+    os.close(handle)
+    upload.save(path)
+    language = session.get('language', 'fr')
+    translations = get_translations(language)
+    # Read the header and first chunk now: once streaming starts the 200 is already sent.
+    try:
+        next(iter_listing_chunks(path), None)
+    except Exception as e:
+        logging.error(f"Batch import error: {e}")
+        os.remove(path)
+        return render_template('index.html',
+                               translations=translations,
+                               language=language,
+                               form_data=session.get('form_data', {}),
+                               error=translations['error_invalid_input'])
+    body = stream_export(fmt, translations,
+                         properties=lambda: listing_properties(path),
+                         errors=lambda: listing_errors(path),
+                         section=section)
+    filename = f"movenest_batch.{fmt}" if fmt == 'xlsx' else f"movenest_batch_{section}.csv"
+    response = Response(body,
+                        mimetype=EXPORT_MIMETYPES[fmt],
+                        headers={'Content-Disposition': f'attachment; filename={filename}'})
+    response.call_on_close(lambda: os.remove(path))
+    return response
+
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,208 @@
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import logging
+import mimetypes
+import os
+import re
+from functools import lru_cache
+
+from werkzeug.http import parse_accept_header
+from werkzeug.security import safe_join
+from werkzeug.wsgi import wrap_file
+
+try:
+    from PIL import Image
+    has_pil = True
+except ImportError:
+    has_pil = False
+
+try:
+    import brotli
+    has_brotli = True
+except ImportError:
+    try:
+        import brotlicffi as brotli
+        has_brotli = True
+    except ImportError:
+        has_brotli = False
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_FILE = os.path.join(DIST_DIR, 'manifest.json')
+
+CACHE_CONTROL = 'public, max-age=31536000, immutable'
+COMPRESSIBLE = ('.css', '.js', '.svg')
+IMAGES = ('.png', '.jpg', '.jpeg')
+# The logo is displayed at most 180px wide; keep enough pixels for 2x screens.
+MAX_IMAGE_SIZE = 512
+
+mimetypes.add_type('image/webp', '.webp')
+mimetypes.add_type('image/avif', '.avif')
+
+_STRING = re.compile(r'''("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')''')
+_CSS_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+
+
+def minify_css(source):
+    parts = _STRING.split(_CSS_COMMENT.sub('', source))
+    for index in range(0, len(parts), 2):
+        code = re.sub(r'\s+', ' ', parts[index])
+        code = re.sub(r'\s*([{};,>])\s*', r'\1', code)
+        code = re.sub(r':\s+', ':', code)
+        parts[index] = code.replace(';}', '}')
+    return ''.join(parts).strip()
+
+
+def _fingerprinted(relative, data):
+    root, extension = os.path.splitext(relative)
+    return f"dist/{root}.{hashlib.sha256(data).hexdigest()[:12]}{extension}"
+
+
+def _write(relative, data, compress=False):
+    path = os.path.join(STATIC_DIR, *relative.split('/'))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as output:
+        output.write(data)
+    written = [path]
+    if compress:
+        with open(path + '.gz', 'wb') as output:
+            output.write(gzip.compress(data, compresslevel=9, mtime=0))
+        written.append(path + '.gz')
+        if has_brotli:
+            with open(path + '.br', 'wb') as output:
+                output.write(brotli.compress(data))
+            written.append(path + '.br')
+    return written
+
+
+def _image_variants(data):
+    """Yield (extension, bytes) for the optimized image and its WebP/AVIF variants."""
+    if not has_pil:
+        yield None, data
+        return
+    image = Image.open(io.BytesIO(data))
+    source_format = image.format
+    image.thumbnail((MAX_IMAGE_SIZE, MAX_IMAGE_SIZE))
+    Image.init()
+    for extension, image_format, options in ((None, source_format, {'optimize': True}),
+                                             ('.webp', 'WEBP', {'quality': 85, 'method': 6}),
+                                             ('.avif', 'AVIF', {'quality': 60})):
+        if image_format not in Image.SAVE:
+            continue
+        output = io.BytesIO()
+        image.save(output, image_format, **options)
+        yield extension, output.getvalue()
+
+
+def build_assets(clean=False):
+    """Minify CSS, then fingerprint and precompress everything under static/ into static/dist/.
+
+    JavaScript is copied as is: stripping it safely needs a real tokenizer
+    (template literals, regex literals), and gzip/brotli recover most of the gain.
+    """
+    manifest = {}
+    written = set()
+    for directory, _, filenames in os.walk(STATIC_DIR):
+        if os.path.commonpath([directory, DIST_DIR]) == DIST_DIR:
+            continue
+        for filename in sorted(filenames):
+            path = os.path.join(directory, filename)
+            relative = os.path.relpath(path, STATIC_DIR).replace(os.sep, '/')
+            extension = os.path.splitext(filename)[1].lower()
+            with open(path, 'rb') as source:
+                data = source.read()
+            if extension == '.css':
+                outputs = [(relative, minify_css(data.decode('utf-8')).encode('utf-8'))]
+            elif extension in IMAGES:
+                outputs = [(os.path.splitext(relative)[0] + variant if variant else relative, image)
+                           for variant, image in _image_variants(data)]
+            else:
+                outputs = [(relative, data)]
+            for name, output in outputs:
+                manifest[name] = _fingerprinted(name, output)
+                written.update(_write(manifest[name], output, name.lower().endswith(COMPRESSIBLE)))
+
+    os.makedirs(DIST_DIR, exist_ok=True)
+    with open(MANIFEST_FILE + '.tmp', 'w', encoding='utf-8') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+        manifest_file.write('\n')
+    os.replace(MANIFEST_FILE + '.tmp', MANIFEST_FILE)
+    written.add(MANIFEST_FILE)
+
+    if clean:
+        # Only on request: workers still running the previous manifest reference the old files.
+        for directory, _, filenames in os.walk(DIST_DIR):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                if path not in written:
+                    os.remove(path)
+    load_asset_manifest.cache_clear()
+    return manifest
+
+
+@lru_cache(maxsize=None)
+def load_asset_manifest():
+    """Source filename -> fingerprinted filename; empty when assets have not been built."""
+    try:
+        with open(MANIFEST_FILE, encoding='utf-8') as manifest_file:
+            return json.load(manifest_file)
+    except (OSError, ValueError):
+        logging.info("No built asset manifest, serving static files unfingerprinted")
+        return {}
+
+
+class FingerprintedAssets:
+    """WSGI middleware serving static/dist/ ahead of Flask, so hits skip sessions and auth hooks.
+
+    Files are content-hashed, so they get a year-long immutable Cache-Control and
+    the precompressed .br/.gz copy matching Accept-Encoding is sent when present.
+    """
+
+    def __init__(self, app, directory=DIST_DIR, prefix='/static/dist/'):
+        self.app = app
+        self.directory = directory
+        self.prefix = prefix
+
+    def __call__(self, environ, start_response):
+        path_info = environ.get('PATH_INFO', '')
+        method = environ.get('REQUEST_METHOD', 'GET')
+        if not path_info.startswith(self.prefix) or method not in ('GET', 'HEAD'):
+            return self.app(environ, start_response)
+        path = safe_join(self.directory, path_info[len(self.prefix):])
+        # The manifest keeps its name across builds, so it must not be cached as immutable.
+        if (path is None or path.endswith(('.gz', '.br')) or os.path.basename(path) == 'manifest.json'
+                or not os.path.isfile(path)):
+            return self.app(environ, start_response)
+
+        served, encoding = path, None
+        accepted = parse_accept_header(environ.get('HTTP_ACCEPT_ENCODING'))
+        for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if accepted[candidate] and os.path.isfile(path + suffix):
+                served, encoding = path + suffix, candidate
+                break
+
+        etag = f'"{os.path.basename(path)}{"-" + encoding if encoding else ""}"'
+        headers = [('Cache-Control', CACHE_CONTROL), ('Vary', 'Accept-Encoding'), ('ETag', etag)]
+        if environ.get('HTTP_IF_NONE_MATCH') == etag:
+            start_response('304 Not Modified', headers)
+            return []
+
+        headers += [('Content-Type', mimetypes.guess_type(path)[0] or 'application/octet-stream'),
+                    ('Content-Length', str(os.path.getsize(served)))]
+        if encoding:
+            headers.append(('Content-Encoding', encoding))
+        start_response('200 OK', headers)
+        if method == 'HEAD':
+            return []
+        return wrap_file(environ, open(served, 'rb'))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build fingerprinted, precompressed static assets')
+    parser.add_argument('--clean', action='store_true', help='Remove files left over from previous builds')
+    args = parser.parse_args()
+    manifest = build_assets(args.clean)
+    print(f"Built {len(manifest)} assets into {DIST_DIR}")
@@ -1,3 +1,4 @@
+import json
 import numpy as np
 import logging
 
@@ -7,6 +8,54 @@ try:
 except ImportError:
     has_npf = False
 
+PARAMETERS = ['property_price', 'notary_rate', 'renovation_budget', 'monthly_rent',
+              'vacancy_months', 'annual_charges', 'taxe_fonciere', 'annual_capex',
+              'resale_value', 'discount_rate', 'use_loan', 'loan_amount',
+              'interest_rate', 'loan_duration', 'annual_rent_increase',
+              'annual_charges_increase']
+SCENARIO_FIELDS = [name for name in PARAMETERS if name != 'use_loan']
+
+# Each scenario adjusts base inputs as {field: {'mul': x, 'add': y, 'min': lo, 'max': hi}},
+# applied in that order. User-defined scenarios use the same shape.
+SCENARIO_DEFINITIONS = {
+    'base': {},
+    'best': {
+        'vacancy_months': {'add': -1, 'min': 0},
+        'taxe_fonciere': {'mul': 0.99},
+        'resale_value': {'mul': 1.1}
+    },
+    'worst': {
+        'vacancy_months': {'add': 1},
+        'taxe_fonciere': {'mul': 1.02},
+        'resale_value': {'mul': 0.9}
+    }
+}
+SCENARIO_OPERATIONS = ('mul', 'add', 'min', 'max')
+MAX_CUSTOM_SCENARIOS = 5
+
+
+def parse_scenario_definitions(raw):
+    """Validate user-defined scenarios given as JSON {name: {field: {operation: number}}}."""
+    if not raw:
+        return {}
+    definitions = json.loads(raw) if isinstance(raw, str) else raw
+    if not isinstance(definitions, dict) or len(definitions) > MAX_CUSTOM_SCENARIOS:
+        raise ValueError("Custom scenarios must be an object of at most "
+                         f"{MAX_CUSTOM_SCENARIOS} scenarios")
+    parsed = {}
+    for name, adjustments in definitions.items():
+        name = str(name)[:40]
+        if name in SCENARIO_DEFINITIONS or not isinstance(adjustments, dict):
+            raise ValueError(f"Invalid custom scenario {name!r}")
+        for field, rule in adjustments.items():
+            if (field not in SCENARIO_FIELDS or not isinstance(rule, dict)
+                    or not set(rule) <= set(SCENARIO_OPERATIONS)
+                    or not all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in rule.values())):
+                raise ValueError(f"Invalid adjustment for {field!r} in scenario {name!r}")
+        parsed[name] = adjustments
+    return parsed
+
+
 class RealEstateCalculator:
     def __init__(self, property_price, notary_rate, renovation_budget, monthly_rent, 
                  vacancy_months, annual_charges, taxe_fonciere, annual_capex, 
@@ -31,6 +80,22 @@ class RealEstateCalculator:
         self.loan_duration = loan_duration
         self.annual_rent_increase = annual_rent_increase
         self.annual_charges_increase = annual_charges_increase
+
+    def get_parameters(self):
+        return {name: getattr(self, name) for name in PARAMETERS}
+
+    def with_adjustments(self, adjustments):
+        if not adjustments:
+            return self
+        parameters = self.get_parameters()
+        for field, rule in adjustments.items():
+            value = parameters[field] * rule.get('mul', 1) + rule.get('add', 0)
+            if 'min' in rule:
+                value = max(rule['min'], value)
+            if 'max' in rule:
+                value = min(rule['max'], value)
+            parameters[field] = value
+        return RealEstateCalculator(**parameters)
         
     def calculate_notary_fees(self):
         return self.property_price * self.notary_rate
@@ -197,24 +262,7 @@ class RealEstateCalculator:
         tolerance = 1.0
         for _ in range(50):
             mid_rent = (low_rent + high_rent) / 2
-            temp_calc = RealEstateCalculator(
-                property_price=self.property_price,
-                notary_rate=self.notary_rate,
-                renovation_budget=self.renovation_budget,
-                monthly_rent=mid_rent,
-                vacancy_months=self.vacancy_months,
-                annual_charges=self.annual_charges,
-                taxe_fonciere=self.taxe_fonciere,
-                annual_capex=self.annual_capex,
-                resale_value=self.resale_value,
-                discount_rate=self.discount_rate,
-                use_loan=self.use_loan,
-                loan_amount=self.loan_amount,
-                interest_rate=self.interest_rate,
-                loan_duration=self.loan_duration,
-                annual_rent_increase=self.annual_rent_increase,
-                annual_charges_increase=self.annual_charges_increase
-            )
+            temp_calc = RealEstateCalculator(**dict(self.get_parameters(), monthly_rent=mid_rent))
             npv_10 = temp_calc.calculate_npv(10)
             if abs(npv_10) < tolerance:
                 return mid_rent
@@ -231,48 +279,60 @@ class RealEstateCalculator:
             npv_data.append({'year': year, 'npv': npv})
         return npv_data
     
+    def calculate_yearly_schedule(self, years=10):
+        schedule = []
+        annual_loan_payment = self.calculate_monthly_loan_payment() * 12 if self.use_loan else 0
+        for year in range(1, years + 1):
+            gross_income = self.calculate_annual_gross_income(year)
+            net_income = self.calculate_annual_net_income(year)
+            schedule.append({
+                'year': year,
+                'gross_income': gross_income,
+                'operating_expenses': gross_income - net_income - annual_loan_payment,
+                'loan_payment': annual_loan_payment,
+                'net_cash_flow': net_income,
+                'remaining_principal': self.calculate_remaining_principal(year),
+                'npv': self.calculate_npv(year)
+            })
+        return schedule
+
+    def calculate_amortization_schedule(self):
+        if not self.use_loan or self.loan_amount == 0 or self.loan_duration <= 0:
+            return []
+        monthly_payment = self.calculate_monthly_loan_payment()
+        monthly_rate = self.interest_rate / 12
+        balance = self.loan_amount
+        schedule = []
+        for month in range(1, int(self.loan_duration * 12) + 1):
+            interest = balance * monthly_rate
+            principal = monthly_payment - interest
+            balance = max(0, balance - principal)
+            schedule.append({
+                'month': month,
+                'payment': monthly_payment,
+                'interest': interest,
+                'principal': principal,
+                'remaining_principal': balance
+            })
+        return schedule
+
     def calculate_scenario(self, scenario_type='base'):
-        if scenario_type == 'worst':
-            temp_calc = RealEstateCalculator(
-                property_price=self.property_price,
-                notary_rate=self.notary_rate,
-                renovation_budget=self.renovation_budget,
-                monthly_rent=self.monthly_rent,
-                vacancy_months=self.vacancy_months + 1,
-                annual_charges=self.annual_charges,
-                taxe_fonciere=self.taxe_fonciere * 1.02,
-                annual_capex=self.annual_capex,
-                resale_value=self.resale_value * 0.9,
-                discount_rate=self.discount_rate,
-                use_loan=self.use_loan,
-                loan_amount=self.loan_amount,
-                interest_rate=self.interest_rate,
-                loan_duration=self.loan_duration,
-                annual_rent_increase=self.annual_rent_increase,
-                annual_charges_increase=self.annual_charges_increase
-            )
-        elif scenario_type == 'best':
-            temp_calc = RealEstateCalculator(
-                property_price=self.property_price,
-                notary_rate=self.notary_rate,
-                renovation_budget=self.renovation_budget,
-                monthly_rent=self.monthly_rent,
-                vacancy_months=max(0, self.vacancy_months - 1),
-                annual_charges=self.annual_charges,
-                taxe_fonciere=self.taxe_fonciere * 0.99,
-                annual_capex=self.annual_capex,
-                resale_value=self.resale_value * 1.1,
-                discount_rate=self.discount_rate,
-                use_loan=self.use_loan,
-                loan_amount=self.loan_amount,
-                interest_rate=self.interest_rate,
-                loan_duration=self.loan_duration,
-                annual_rent_increase=self.annual_rent_increase,
-                annual_charges_increase=self.annual_charges_increase
-            )
-        else:
-            temp_calc = self
-        return temp_calc.calculate_all_metrics()
+        return self.with_adjustments(SCENARIO_DEFINITIONS.get(scenario_type, {})).calculate_all_metrics()
+
+    def calculate_scenarios(self, definitions=None, language='fr', interpretations=True):
+        """Evaluate every scenario in one pass; interpretations reuse each scenario's metrics.
+
+        Pass interpretations=False when only the numbers are needed (batch exports).
+        """
+        definitions = definitions if definitions is not None else SCENARIO_DEFINITIONS
+        scenarios = {}
+        for name, adjustments in definitions.items():
+            calculator = self.with_adjustments(adjustments)
+            results = calculator.calculate_all_metrics()
+            scenarios[name] = {'results': results}
+            if interpretations:
+                scenarios[name]['interpretations'] = calculator.get_interpretations(language, results)
+        return scenarios
 
     def calculate_all_metrics(self):
         return {
@@ -293,8 +353,9 @@ class RealEstateCalculator:
             'npv_over_time': self.calculate_npv_over_time()
         }
     
-    def get_interpretations(self, language='fr'):
-        results = self.calculate_all_metrics()
+    def get_interpretations(self, language='fr', results=None):
+        if results is None:
+            results = self.calculate_all_metrics()
         interpretations = []
         translations = {
             'fr': {
@@ -0,0 +1,277 @@
+import csv
+import os
+import re
+from itertools import islice
+
+import numpy as np
+
+try:
+    import openpyxl
+    has_openpyxl = True
+except ImportError:
+    has_openpyxl = False
+
+# Calculator keyword -> column kind. Percent columns are entered as 3.5 for 3.5%
+# and decoded to fractions, so callers never divide by 100 themselves. Money
+# columns are euro amounts, where '300.000' and '2,000' are thousands.
+CALCULATOR_SCHEMA = {
+    'property_price': 'money',
+    'notary_rate': 'percent',
+    'renovation_budget': 'money',
+    'monthly_rent': 'money',
+    'vacancy_months': 'float',
+    'annual_charges': 'money',
+    'taxe_fonciere': 'money',
+    'annual_capex': 'money',
+    'resale_value': 'money',
+    'discount_rate': 'percent',
+    'use_loan': 'bool',
+    'loan_amount': 'money',
+    'interest_rate': 'percent',
+    'loan_duration': 'int',
+    'annual_rent_increase': 'percent',
+    'annual_charges_increase': 'percent',
+}
+
+LISTING_SCHEMA = dict(CALCULATOR_SCHEMA,
+                      reference='text',
+                      arrondissement='text',
+                      quartier='text',
+                      surface='float')
+
+DEFAULT_CHUNK_SIZE = 10000
+
+TRUE_VALUES = {'yes', 'y', 'oui', 'o', 'true', 'vrai', 'on', '1', 'نعم'}
+FALSE_VALUES = {'no', 'n', 'non', 'false', 'faux', 'off', '0', 'لا'}
+
+# Arabic-Indic and Extended Arabic-Indic digits, Arabic decimal/thousands
+# separators, and every space or currency mark that shows up in pasted amounts.
+_NUMBER_TABLE = str.maketrans({
+    **{chr(0x0660 + d): str(d) for d in range(10)},
+    **{chr(0x06F0 + d): str(d) for d in range(10)},
+    '\u066b': ',',
+    '\u2212': '-',
+    **{ch: None for ch in ' \u00a0\u202f\u2009\u066c\'€%\u066a'},
+})
+# A lone separator followed by exactly three digits ('3,125', '1.250') reads
+# as either a decimal or a thousands group; only the column kind can tell.
+_THOUSANDS_GROUP = re.compile(r'^-?[1-9]\d{0,2}[.,]\d{3}$')
+_GROUPED = {',': re.compile(r'^-?\d{1,3}(,\d{3})+$'), '.': re.compile(r'^-?\d{1,3}(\.\d{3})+$')}
+# Rates never reach the thousands, so an ambiguous separator there is a decimal;
+# euro amounts are written with grouped thousands, so there it is a group.
+DECIMAL_KINDS = {'percent'}
+THOUSANDS_KINDS = {'money'}
+# Browsers submit type=number inputs with '.' as the decimal mark.
+FORM_DECIMAL_MARK = '.'
+
+
+class DecodeError(Exception):
+    def __init__(self, errors):
+        super().__init__(f"{len(errors)} invalid value(s)")
+        self.errors = errors
+
+
+class DecodedChunk:
+    def __init__(self, start_row, columns, errors):
+        self.start_row = start_row
+        self.columns = columns
+        self.errors = errors
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()), ()))
+
+    @property
+    def valid(self):
+        mask = np.ones(len(self), dtype=bool)
+        for row, _, _ in self.errors:
+            mask[row - self.start_row] = False
+        return mask
+
+    def records(self, fields=CALCULATOR_SCHEMA):
+        """Yield (row_number, kwargs) for every row that decoded cleanly."""
+        columns = {field: self.columns[field].tolist() for field in fields if field in self.columns}
+        for offset, ok in enumerate(self.valid):
+            if ok:
+                yield self.start_row + offset, {field: values[offset] for field, values in columns.items()}
+
+
+def normalize_number(value, kind='float', decimal_mark=None):
+    """Turn '1 234,56', '1.234,56', '٣٫٥ %' or 1234.5 into a string float() accepts; '' if blank.
+
+    Raises ValueError when a lone separator could be either a decimal mark or a
+    thousands group ('2,000', '1.250') and neither kind nor decimal_mark settles it.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return repr(float(value))
+    raw = str(value if value is not None else '').strip()
+    text = raw.translate(_NUMBER_TABLE)
+    if not text:
+        return ''
+    comma, dot = text.rfind(','), text.rfind('.')
+    if comma >= 0 and dot >= 0:
+        decimal = ',' if comma > dot else '.'
+        thousands = '.' if decimal == ',' else ','
+        integer_part = text[:max(comma, dot)]
+        if not _GROUPED[thousands].match(integer_part):
+            raise ValueError(f"Malformed number {value!r}")
+        return integer_part.replace(thousands, '') + '.' + text[max(comma, dot) + 1:]
+    separator = ',' if comma >= 0 else '.' if dot >= 0 else None
+    if separator is None:
+        return text
+    if text.count(separator) > 1:
+        if not _GROUPED[separator].match(text):
+            raise ValueError(f"Malformed number {value!r}")
+        return text.replace(separator, '')
+    # The Arabic decimal separator (٫) is never a thousands mark.
+    if separator == decimal_mark or '\u066b' in raw or not _THOUSANDS_GROUP.match(text):
+        return text.replace(separator, '.')
+    if kind in THOUSANDS_KINDS:
+        return text.replace(separator, '')
+    if kind not in DECIMAL_KINDS:
+        raise ValueError(f"Ambiguous separator in {value!r}")
+    return text.replace(separator, '.')
+
+
+def parse_number(value, default=0.0, kind='float', decimal_mark=None):
+    try:
+        text = normalize_number(value, kind, decimal_mark)
+        return float(text) if text else default
+    except ValueError:
+        return default
+
+
+def parse_form_number(form_data, field, default=0.0):
+    """Read one submitted form field the way decode_form does, default if blank or invalid."""
+    return parse_number(form_data.get(field), default, LISTING_SCHEMA.get(field, 'float'), FORM_DECIMAL_MARK)
+
+
+def _to_float(text):
+    try:
+        return float(text)
+    except ValueError:
+        return np.nan
+
+
+def _normalize_cell(value, kind, decimal_mark):
+    try:
+        return normalize_number(value, kind, decimal_mark) or '0'
+    except ValueError:
+        return 'nan'
+
+
+def _decode_numbers(values, kind, field, start_row, errors, decimal_mark=None):
+    texts = [_normalize_cell(value, kind, decimal_mark) for value in values]
+    try:
+        # Fast path: numpy converts the whole column in one call.
+        numbers = np.array(texts, dtype=np.str_).astype(np.float64)
+    except ValueError:
+        numbers = np.array([_to_float(text) for text in texts], dtype=np.float64)
+    invalid = ~np.isfinite(numbers)
+    for offset in np.flatnonzero(invalid):
+        errors.append((start_row + int(offset), field, values[offset]))
+    numbers[invalid] = 0
+    return numbers
+
+
+def decode_column(values, kind, field='', start_row=0, errors=None, decimal_mark=None):
+    """Decode one column of raw cells; invalid cells are appended to errors and left at 0."""
+    errors = errors if errors is not None else []
+    if kind == 'text':
+        return np.array(['' if value is None else str(value).strip() for value in values], dtype=object)
+    if kind == 'bool':
+        decoded = np.zeros(len(values), dtype=bool)
+        for offset, value in enumerate(values):
+            token = str(value if value is not None else '').strip().lower()
+            if token in TRUE_VALUES:
+                decoded[offset] = True
+            elif token and token not in FALSE_VALUES:
+                errors.append((start_row + offset, field, value))
+        return decoded
+
+    numbers = _decode_numbers(values, kind, field, start_row, errors, decimal_mark)
+    if kind == 'percent':
+        return numbers / 100
+    if kind == 'int':
+        fractional = numbers != np.round(numbers)
+        for offset in np.flatnonzero(fractional):
+            errors.append((start_row + int(offset), field, values[offset]))
+        return np.where(fractional, 0, numbers).astype(np.int64)
+    return numbers
+
+
+def normalize_header(name):
+    return re.sub(r'[\s\-]+', '_', str(name or '').strip().lower())
+
+
+def decode_chunk(header, rows, schema=LISTING_SCHEMA, start_row=2, decimal_mark=None):
+    """Decode a block of raw rows column by column against schema."""
+    positions = {normalize_header(name): index for index, name in enumerate(header)}
+    errors = []
+    columns = {}
+    raw_columns = {}
+    for field, kind in schema.items():
+        index = positions.get(field)
+        if index is None:
+            raw = [None] * len(rows)
+        else:
+            raw = [row[index] if index < len(row) else None for row in rows]
+        raw_columns[field] = raw
+        columns[field] = decode_column(raw, kind, field, start_row, errors, decimal_mark)
+    if 'use_loan' in columns and 'loan_duration' in columns:
+        # The monthly loan payment divides by the duration.
+        flagged = {row for row, field, _ in errors if field == 'loan_duration'}
+        for offset in np.flatnonzero(columns['use_loan'] & (columns['loan_duration'] <= 0)):
+            if start_row + int(offset) not in flagged:
+                errors.append((start_row + int(offset), 'loan_duration', raw_columns['loan_duration'][offset]))
+    errors.sort(key=lambda error: error[:2])
+    return DecodedChunk(start_row, columns, errors)
+
+
+def decode_form(form_data, schema=CALCULATOR_SCHEMA):
+    """Decode a single submitted form into calculator keyword arguments."""
+    fields = list(schema)
+    chunk = decode_chunk(fields, [[form_data.get(field) for field in fields]], schema, start_row=0,
+                         decimal_mark=FORM_DECIMAL_MARK)
+    if chunk.errors:
+        raise DecodeError(chunk.errors)
+    return next(chunk.records(schema))[1]
+
+
+def _csv_rows(path):
+    with open(path, newline='', encoding='utf-8-sig') as csv_file:
+        sample = csv_file.read(4096)
+        csv_file.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        yield from csv.reader(csv_file, dialect)
+
+
+def _xlsx_rows(path):
+    if not has_openpyxl:
+        raise RuntimeError("openpyxl is required to import .xlsx files")
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        yield from workbook.active.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def iter_listing_chunks(path, schema=LISTING_SCHEMA, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Stream a CSV/XLSX listing file as DecodedChunks of at most chunk_size rows.
+
+    Raises ValueError when the file has no header row naming a schema column.
+    """
+    extension = os.path.splitext(str(path))[1].lower()
+    rows = _xlsx_rows(path) if extension in ('.xlsx', '.xlsm') else _csv_rows(path)
+    header = next(rows, None)
+    if header is None or not {normalize_header(name) for name in header} & set(schema):
+        raise ValueError(f"No recognised column header in {os.path.basename(str(path))}")
+    start_row = 2
+    while True:
+        block = list(islice(rows, chunk_size))
+        if not block:
+            break
+        yield decode_chunk(header, block, schema, start_row)
+        start_row += len(block)
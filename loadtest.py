@@ -0,0 +1,398 @@
+"""Offline load test for the login -> calculate -> export flow.
+
+Boots the app under gunicorn on a local port (or targets --url), drives
+concurrent scripted sessions and writes a JSON report with throughput,
+per-route latency percentiles, error rates and worker RSS growth:
+
+    python loadtest.py --workers 2 --threads 4 --sessions 16 --duration 60
+    python loadtest.py --output after.json --compare before.json
+"""
+import argparse
+import http.client
+import json
+import math
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+SAMPLE_PROPERTY = {
+    'property_price': '320000',
+    'notary_rate': '8',
+    'renovation_budget': '20000',
+    'monthly_rent': '1250',
+    'vacancy_months': '1',
+    'annual_charges': '1800',
+    'taxe_fonciere': '950',
+    'annual_capex': '600',
+    'resale_value': '380000',
+    'discount_rate': '4',
+    'use_loan': 'yes',
+    'loan_amount': '250000',
+    'interest_rate': '3.2',
+    'loan_duration': '20',
+    'annual_rent_increase': '1.5',
+    'annual_charges_increase': '2',
+    'arrondissement': '11',
+    'surface': '42',
+}
+SCENARIOS = ['base', 'best', 'worst']
+
+# Route -> (expected status, expected Content-Type prefix or redirect target)
+EXPECTATIONS = {
+    'POST /login': (302, '/'),
+    'POST /calculate': (200, 'text/html'),
+    'GET /toggle_language': (302, '/'),
+    'GET /export_pdf': (200, 'application/pdf'),
+}
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def read_rss_kb(pid):
+    try:
+        with open(f'/proc/{pid}/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def child_pids(parent):
+    children = []
+    for entry in os.listdir('/proc') if os.path.isdir('/proc') else []:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as stat:
+                fields = stat.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == parent:
+            children.append(int(entry))
+    return children
+
+
+class Server:
+    def __init__(self, args):
+        self.args = args
+        self.port = free_port()
+        self.process = None
+
+    def __enter__(self):
+        command = [sys.executable, '-m', 'gunicorn', self.args.app,
+                   '--bind', f'127.0.0.1:{self.port}',
+                   '--workers', str(self.args.workers),
+                   '--threads', str(self.args.threads),
+                   '--worker-class', self.args.worker_class or ('gthread' if self.args.threads > 1 else 'sync'),
+                   '--log-level', 'warning']
+        env = dict(os.environ, ADMIN_USERNAME=self.args.username, ADMIN_PASSWORD=self.args.password,
+                   SESSION_SECRET='loadtest-secret')
+        self.process = subprocess.Popen(command, cwd=ROOT, env=env)
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"gunicorn exited with status {self.process.returncode}")
+            try:
+                with socket.create_connection(('127.0.0.1', self.port), timeout=0.5):
+                    break
+            except OSError:
+                time.sleep(0.2)
+        else:
+            # __exit__ does not run when __enter__ raises, so stop gunicorn here.
+            self.process.kill()
+            self.process.wait()
+            raise RuntimeError("gunicorn did not start listening within 30s")
+        # Wait until every worker has booted, so RSS sampling starts from a steady set.
+        while len(child_pids(self.process.pid)) < self.args.workers and time.monotonic() < deadline:
+            time.sleep(0.2)
+        return self
+
+    def __exit__(self, *exc):
+        self.process.send_signal(signal.SIGTERM)
+        try:
+            self.process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.port}'
+
+
+class RssSampler(threading.Thread):
+    def __init__(self, master_pid, interval=1.0):
+        super().__init__(daemon=True)
+        self.master_pid = master_pid
+        self.interval = interval
+        self.samples = {}
+        self.stopped = threading.Event()
+
+    def sample(self):
+        for pid in child_pids(self.master_pid):
+            rss = read_rss_kb(pid)
+            if rss is not None:
+                self.samples.setdefault(pid, []).append(rss)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def report(self):
+        workers = {str(pid): {'start_mb': values[0] / 1024, 'end_mb': values[-1] / 1024,
+                              'peak_mb': max(values) / 1024, 'growth_mb': (values[-1] - values[0]) / 1024}
+                   for pid, values in self.samples.items()}
+        return {'workers': workers,
+                'total_growth_mb': sum(worker['growth_mb'] for worker in workers.values())}
+
+
+class Session:
+    """One scripted user: log in, then repeat calculate/toggle/export until the deadline."""
+
+    def __init__(self, url, args, recorder, seed):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.args = args
+        self.recorder = recorder
+        self.random = random.Random(seed)
+        self.cookies = {}
+        self.connection = None
+
+    def request(self, method, path, body=None):
+        route = f'{method} {path}'
+        headers = {'Connection': 'keep-alive'}
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{name}={value}' for name, value in self.cookies.items())
+        if body is not None:
+            body = urlencode(body)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        started = time.perf_counter()
+        try:
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.args.timeout)
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException) as e:
+            self.recorder.record(route, time.perf_counter() - started, False, type(e).__name__)
+            self.connection = None
+            return
+        elapsed = time.perf_counter() - started
+        for header in response.headers.get_all('Set-Cookie') or []:
+            for name, morsel in SimpleCookie(header).items():
+                self.cookies[name] = morsel.value
+
+        expected_status, expected = EXPECTATIONS.get(route, (200, ''))
+        if response.status != expected_status:
+            self.recorder.record(route, elapsed, False, f'HTTP {response.status}')
+        elif expected_status == 302 and urlsplit(response.headers.get('Location', '')).path != expected:
+            self.recorder.record(route, elapsed, False, f"redirect to {response.headers.get('Location')}")
+        elif expected_status == 200 and not (response.headers.get('Content-Type') or '').startswith(expected):
+            self.recorder.record(route, elapsed, False, f"Content-Type {response.headers.get('Content-Type')}")
+        else:
+            self.recorder.record(route, elapsed, True)
+
+    def warm_up(self):
+        """One pass through every route, so workers have imported and cached everything."""
+        self.request('POST', '/login', {'username': self.args.username, 'password': self.args.password})
+        self.request('POST', '/calculate', dict(SAMPLE_PROPERTY, scenario='base'))
+        self.request('GET', '/export_pdf')
+        if self.connection is not None:
+            self.connection.close()
+
+    def run(self, deadline):
+        self.request('POST', '/login', {'username': self.args.username, 'password': self.args.password})
+        while time.monotonic() < deadline:
+            for _ in range(self.args.calculations):
+                form = dict(SAMPLE_PROPERTY, scenario=self.random.choice(SCENARIOS))
+                form['monthly_rent'] = str(self.random.randrange(900, 1600, 10))
+                self.request('POST', '/calculate', form)
+            if self.random.random() < self.args.toggle_ratio:
+                self.request('GET', '/toggle_language')
+            if self.random.random() < self.args.export_ratio:
+                self.request('GET', '/export_pdf')
+        if self.connection is not None:
+            self.connection.close()
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+
+    def record(self, route, elapsed, ok, reason=None):
+        with self.lock:
+            self.latencies.setdefault(route, []).append(elapsed)
+            if not ok:
+                route_errors = self.errors.setdefault(route, {})
+                route_errors[reason] = route_errors.get(reason, 0) + 1
+
+    def report(self, wall_time):
+        routes = {}
+        for route, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            errors = sum(self.errors.get(route, {}).values())
+            routes[route] = {
+                'requests': len(values),
+                'errors': errors,
+                'error_rate': errors / len(values),
+                'error_reasons': self.errors.get(route, {}),
+                'throughput_rps': len(values) / wall_time,
+                'mean_ms': sum(values) / len(values) * 1000,
+                'p50_ms': percentile(values, 0.50) * 1000,
+                'p95_ms': percentile(values, 0.95) * 1000,
+                'p99_ms': percentile(values, 0.99) * 1000,
+            }
+        total = sum(route['requests'] for route in routes.values())
+        total_errors = sum(route['errors'] for route in routes.values())
+        return {'requests': total,
+                'errors': total_errors,
+                'error_rate': total_errors / total if total else 0,
+                'throughput_rps': total / wall_time,
+                'routes': routes}
+
+
+def warm_up(url, args):
+    """Run throwaway sessions before measuring; returns their error counts by route."""
+    recorder = Recorder()
+    for _ in range(args.warmup):
+        # Concurrent sessions so requests spread over every worker.
+        sessions = [Session(url, args, recorder, -1 - index) for index in range(max(args.sessions, args.workers))]
+        threads = [threading.Thread(target=session.warm_up) for session in sessions]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return {route: sum(reasons.values()) for route, reasons in recorder.errors.items()}
+
+
+def run_load(url, args):
+    recorder = Recorder()
+    deadline = time.monotonic() + args.duration
+    sessions = [Session(url, args, recorder, args.seed + index) for index in range(args.sessions)]
+    threads = [threading.Thread(target=session.run, args=(deadline,)) for session in sessions]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder.report(time.monotonic() - started)
+
+
+def print_report(report, baseline=None):
+    config = report['config']
+    print(f"\n{report['revision'] or 'unknown revision'}  workers={config['workers']} "
+          f"threads={config['threads']} sessions={config['sessions']} duration={config['duration']}s")
+    print(f"{'route':<24}{'req':>8}{'err%':>8}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for route, stats in report['results']['routes'].items():
+        line = (f"{route:<24}{stats['requests']:>8}{stats['error_rate'] * 100:>7.1f}%{stats['throughput_rps']:>9.1f}"
+                f"{stats['p50_ms']:>8.0f}ms{stats['p95_ms']:>7.0f}ms{stats['p99_ms']:>7.0f}ms")
+        previous = (baseline or {}).get('results', {}).get('routes', {}).get(route)
+        if previous:
+            line += f"   p95 {(stats['p95_ms'] / previous['p95_ms'] - 1) * 100:+.0f}%"
+        print(line)
+    results = report['results']
+    line = f"total {results['requests']} requests, {results['throughput_rps']:.1f} req/s, " \
+           f"{results['error_rate'] * 100:.2f}% errors"
+    if baseline:
+        line += f" (throughput {(results['throughput_rps'] / baseline['results']['throughput_rps'] - 1) * 100:+.0f}%" \
+                " vs baseline)"
+    print(line)
+    if report.get('warmup_errors'):
+        print(f"warm-up errors: {report['warmup_errors']}")
+    if report.get('rss'):
+        print(f"worker RSS growth: {report['rss']['total_growth_mb']:+.1f} MB across "
+              f"{len(report['rss']['workers'])} worker(s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--app', default='main:app', help='WSGI app for gunicorn (default: main:app)')
+    parser.add_argument('--url', help='Target an already running server instead of booting one')
+    parser.add_argument('--username', default=os.environ.get('ADMIN_USERNAME', 'loadtest'),
+                        help='Login for the sessions (default: $ADMIN_USERNAME)')
+    parser.add_argument('--password', default=os.environ.get('ADMIN_PASSWORD', 'loadtest'),
+                        help='Password for the sessions (default: $ADMIN_PASSWORD)')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=1)
+    parser.add_argument('--worker-class', help='gunicorn worker class (default: sync, or gthread with --threads)')
+    parser.add_argument('--sessions', type=int, default=8, help='Concurrent scripted users')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds of load')
+    parser.add_argument('--calculations', type=int, default=3, help='/calculate posts per loop')
+    parser.add_argument('--toggle-ratio', type=float, default=0.3, help='Chance of /toggle_language per loop')
+    parser.add_argument('--export-ratio', type=float, default=0.2, help='Chance of /export_pdf per loop')
+    parser.add_argument('--timeout', type=float, default=60, help='Per-request timeout in seconds')
+    parser.add_argument('--warmup', type=int, default=1,
+                        help='Unmeasured login/calculate/export rounds before the baseline RSS sample')
+    parser.add_argument('--seed', type=int, default=1, help='Seed so runs replay the same request mix')
+    parser.add_argument('--output', help='Report path (default: loadtest-<revision>-<time>.json)')
+    parser.add_argument('--compare', help='Earlier report to diff against')
+    args = parser.parse_args()
+
+    report = {
+        'revision': git_revision(),
+        'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'config': {key: value for key, value in vars(args).items() if key not in ('output', 'compare', 'password')},
+    }
+    if args.url:
+        report['warmup_errors'] = warm_up(args.url, args)
+        report['results'] = run_load(args.url, args)
+    else:
+        with Server(args) as server:
+            # Baseline RSS after the warm-up, so growth excludes first-import cost.
+            report['warmup_errors'] = warm_up(server.url, args)
+            sampler = RssSampler(server.process.pid)
+            sampler.sample()
+            sampler.start()
+            report['results'] = run_load(server.url, args)
+            sampler.stopped.set()
+            sampler.join()
+            sampler.sample()
+            report['rss'] = sampler.report()
+
+    output = args.output or f"loadtest-{report['revision'] or 'local'}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    with open(output, 'w', encoding='utf-8') as report_file:
+        json.dump(report, report_file, indent=2)
+        report_file.write('\n')
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+    print_report(report, baseline)
+    print(f"report written to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import os
+import re
+from datetime import date
+from functools import lru_cache
+
+import numpy as np
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+MARKET_CSV = os.path.join(DATA_DIR, 'paris_market.csv')
+MARKET_FILE = os.path.join(DATA_DIR, 'paris_market.npy')
+MARKET_MANIFEST = os.path.join(DATA_DIR, 'paris_market.json')
+
+# Stored column-major: one contiguous row of the array per column.
+# rent_m2 is monthly, charges_m2 and taxe_fonciere_m2 are yearly, all in €/m².
+MARKET_COLUMNS = ['rent_m2', 'price_m2', 'charges_m2', 'taxe_fonciere_m2']
+
+# Form field -> market column, scaled by the property surface
+REFERENCE_FIELDS = {
+    'property_price': 'price_m2',
+    'monthly_rent': 'rent_m2',
+    'annual_charges': 'charges_m2',
+    'taxe_fonciere': 'taxe_fonciere_m2',
+}
+
+# Inputs further than this ratio from the market reference are flagged.
+OUTLIER_TOLERANCE = 0.4
+
+# 75001-75020, plus 75116 for the northern half of the 16th.
+_PARIS_POSTCODE = re.compile(r'^75(0\d\d|116)$')
+
+
+def zone_key(arrondissement, quartier=''):
+    """Normalize '11', '11e', 11, 11.0 or '75011' to '75011', optionally with ':quartier'.
+
+    Five-digit values must be Paris postcodes; anything else returns None.
+    """
+    text = str(arrondissement if arrondissement is not None else '').strip()
+    try:
+        # Spreadsheet cells arrive as 11.0, which must not become '110'.
+        text = str(int(float(text)))
+    except (ValueError, OverflowError):
+        pass
+    digits = ''.join(ch for ch in text if ch.isdigit())
+    if not digits:
+        return None
+    if len(digits) == 5:
+        if not _PARIS_POSTCODE.match(digits):
+            return None
+        digits = digits[-2:]
+    number = int(digits)
+    if not 1 <= number <= 20:
+        return None
+    key = f"750{number:02d}"
+    quartier = str(quartier or '').strip().lower()
+    return f"{key}:{quartier}" if quartier else key
+
+
+class MarketIndex:
+    def __init__(self, data, zones, version):
+        self.data = data
+        self.zones = zones
+        self.version = version
+        self._rows = {zone: row for row, zone in enumerate(zones)}
+
+    def _row(self, arrondissement, quartier=''):
+        key = zone_key(arrondissement, quartier)
+        if key is None:
+            return None
+        if key in self._rows:
+            return self._rows[key]
+        return self._rows.get(key.split(':', 1)[0])
+
+    def lookup(self, arrondissement, quartier=''):
+        row = self._row(arrondissement, quartier)
+        if row is None:
+            return None
+        return {name: float(self.data[col, row]) for col, name in enumerate(MARKET_COLUMNS)}
+
+    def reference_values(self, arrondissement, surface, quartier=''):
+        reference = self.lookup(arrondissement, quartier)
+        if reference is None or surface <= 0:
+            return None
+        return {field: reference[column] * surface for field, column in REFERENCE_FIELDS.items()}
+
+    def check_inputs(self, arrondissement, surface, values, quartier=''):
+        reference = self.reference_values(arrondissement, surface, quartier)
+        if reference is None:
+            return []
+        warnings = []
+        for field, expected in reference.items():
+            value = values.get(field)
+            if not value or expected <= 0:
+                continue
+            if abs(value - expected) / expected > OUTLIER_TOLERANCE:
+                warnings.append({'field': field, 'value': value, 'reference': expected})
+        return warnings
+
+    def comparable_rents(self, arrondissements, surfaces, quartiers=None):
+        """Reference monthly rents for a batch of properties; NaN where the zone is unknown."""
+        quartiers = quartiers if quartiers is not None else [''] * len(arrondissements)
+        rows = [self._row(a, q) for a, q in zip(arrondissements, quartiers)]
+        rows = np.array([-1 if row is None else row for row in rows], dtype=np.int64)
+        rent_m2 = np.asarray(self.data[MARKET_COLUMNS.index('rent_m2')])
+        rents = np.where(rows >= 0, rent_m2[rows.clip(min=0)], np.nan)
+        return rents * np.asarray(surfaces, dtype=np.float64)
+
+
+@lru_cache(maxsize=None)
+def get_market_index():
+    """Load the bundled market file once per process; None if it is missing."""
+    try:
+        with open(MARKET_MANIFEST, encoding='utf-8') as manifest_file:
+            manifest = json.load(manifest_file)
+        data = np.load(MARKET_FILE, mmap_mode='r')
+    except (OSError, ValueError) as e:
+        logging.warning(f"Market reference data unavailable: {e}")
+        return None
+    if manifest.get('columns') != MARKET_COLUMNS or data.shape != (len(MARKET_COLUMNS), len(manifest['zones'])):
+        logging.warning("Market reference data does not match the expected layout, ignoring it")
+        return None
+    return MarketIndex(data, manifest['zones'], manifest['version'])
+
+
+def build_market_file(csv_path=MARKET_CSV, version=None):
+    with open(csv_path, newline='', encoding='utf-8') as csv_file:
+        rows = list(csv.DictReader(csv_file))
+
+    zones = []
+    for row in rows:
+        key = zone_key(row['zone'], row.get('quartier', ''))
+        if key is None:
+            raise ValueError(f"Invalid zone in market CSV: {row['zone']!r}")
+        zones.append(key)
+    if len(set(zones)) != len(zones):
+        raise ValueError("Duplicate zones in market CSV")
+
+    data = np.array([[float(row[column]) for row in rows] for column in MARKET_COLUMNS], dtype='<f8')
+    with open(csv_path, 'rb') as csv_file:
+        checksum = hashlib.sha256(csv_file.read()).hexdigest()
+    manifest = {
+        'version': version or date.today().isoformat(),
+        'source_sha256': checksum,
+        'columns': MARKET_COLUMNS,
+        'zones': zones,
+    }
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+    with open(MARKET_FILE + '.tmp', 'wb') as data_file:
+        np.save(data_file, data)
+    with open(MARKET_MANIFEST + '.tmp', 'w', encoding='utf-8') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+        manifest_file.write('\n')
+    os.replace(MARKET_FILE + '.tmp', MARKET_FILE)
+    os.replace(MARKET_MANIFEST + '.tmp', MARKET_MANIFEST)
+    get_market_index.cache_clear()
+    return manifest
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Rebuild the bundled Paris market reference file')
+    parser.add_argument('csv_path', nargs='?', default=MARKET_CSV)
+    parser.add_argument('--version', help='Dataset version label (defaults to today)')
+    args = parser.parse_args()
+    manifest = build_market_file(args.csv_path, args.version)
+    print(f"Market data {manifest['version']}: {len(manifest['zones'])} zones written to {MARKET_FILE}")
@@ -8,6 +8,7 @@ from reportlab.lib.colors import Color
 import matplotlib.pyplot as plt
 import matplotlib
 matplotlib.use('Agg')  # Use non-interactive backend
+from input_decoder import parse_form_number
 
 def generate_npv_chart(npv_data):
     plt.figure(figsize=(10, 6))
@@ -63,9 +64,9 @@ def generate_pdf_report(results, interpretations, form_data, calculator, languag
         disclaimer = "⚠️ Ce rapport est à titre informatif uniquement et ne constitue pas un conseil financier officiel."
         property_data = [
             ['Détails de la Propriété', ''],
-            ['Prix de la Propriété', f"{float(form_data.get('property_price', 0)):,.0f} €"],
-            ['Loyer Mensuel', f"{float(form_data.get('monthly_rent', 0)):,.0f} €"],
-            ['Budget Rénovation', f"{float(form_data.get('renovation_budget', 0)):,.0f} €"]
+            ['Prix de la Propriété', f"{parse_form_number(form_data, 'property_price'):,.0f} €"],
+            ['Loyer Mensuel', f"{parse_form_number(form_data, 'monthly_rent'):,.0f} €"],
+            ['Budget Rénovation', f"{parse_form_number(form_data, 'renovation_budget'):,.0f} €"]
         ]
         results_data = [
             ['Métriques Financières', 'Valeur'],
@@ -82,9 +83,9 @@ def generate_pdf_report(results, interpretations, form_data, calculator, languag
         disclaimer = "⚠️ هذا التقرير لأغراض إعلامية فقط ولا يشكل نصيحة مالية رسمية."
         property_data = [
             ['تفاصيل العقار', ''],
-            ['سعر العقار', f"{float(form_data.get('property_price', 0)):,.0f} €"],
-            ['الإيجار الشهري', f"{float(form_data.get('monthly_rent', 0)):,.0f} €"],
-            ['ميزانية التجديد', f"{float(form_data.get('renovation_budget', 0)):,.0f} €"]
+            ['سعر العقار', f"{parse_form_number(form_data, 'property_price'):,.0f} €"],
+            ['الإيجار الشهري', f"{parse_form_number(form_data, 'monthly_rent'):,.0f} €"],
+            ['ميزانية التجديد', f"{parse_form_number(form_data, 'renovation_budget'):,.0f} €"]
         ]
         results_data = [
             ['المقاييس المالية', 'القيمة'],
@@ -0,0 +1,187 @@
+import hashlib
+import json
+import logging
+import os
+import stat
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+def cache_key(**material):
+    """Canonical hash of everything that shapes a rendered fragment."""
+    payload = json.dumps(material, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def check_private_directory(directory):
+    """Raise PermissionError unless directory is a real directory only this user can write to."""
+    info = os.lstat(directory)
+    if not stat.S_ISDIR(info.st_mode):
+        raise PermissionError(f"{directory} is not a directory")
+    if info.st_uid != os.geteuid():
+        raise PermissionError(f"{directory} is owned by another user")
+    if info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise PermissionError(f"{directory} is writable by other users")
+
+
+class MemoryBackend:
+    """Per-process LRU with a TTL on every entry."""
+
+    name = 'memory'
+
+    def __init__(self, max_entries=256, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DiskBackend:
+    """Entries shared by every worker on the host, one file each.
+
+    The first line of a file holds its expiry time; the mtime is bumped on every
+    hit so pruning the oldest mtimes approximates LRU across processes. Entries
+    are served as trusted HTML, so the directory must be private to this user.
+    """
+
+    name = 'disk'
+
+    def __init__(self, directory, max_entries=1024, ttl=3600):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.ttl = ttl
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        check_private_directory(self.directory)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.html')
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, encoding='utf-8') as entry:
+                expires = float(entry.readline())
+                value = entry.read()
+        except (OSError, ValueError):
+            return None
+        if expires < time.time():
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def set(self, key, value):
+        handle, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'w', encoding='utf-8') as entry:
+                entry.write(f'{time.time() + self.ttl}\n')
+                entry.write(value)
+            os.replace(temporary, self._path(key))
+        except OSError as e:
+            logging.warning(f"Render cache write failed: {e}")
+            self._remove(temporary)
+            return
+        self._prune()
+
+    def _prune(self):
+        try:
+            entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith('.html')]
+        except OSError:
+            return
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=self._mtime)
+        for entry in entries[:len(entries) - self.max_entries]:
+            self._remove(entry.path)
+
+    @staticmethod
+    def _mtime(entry):
+        try:
+            return entry.stat().st_mtime
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def __len__(self):
+        try:
+            return sum(1 for entry in os.scandir(self.directory) if entry.name.endswith('.html'))
+        except OSError:
+            return 0
+
+
+class RenderCache:
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        value = self.backend.get(key) if self.backend is not None else None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value):
+        if self.backend is not None:
+            self.backend.set(key, value)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': self.backend.name if self.backend is not None else 'off',
+            'entries': len(self.backend) if self.backend is not None else 0,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0,
+        }
+
+
+def make_render_cache(kind='memory', directory=None, max_entries=256, ttl=3600):
+    """Build a cache from configuration: 'memory', 'disk' or 'off'."""
+    if kind == 'off':
+        return RenderCache(None)
+    if kind == 'disk':
+        try:
+            return RenderCache(DiskBackend(directory, max_entries, ttl))
+        except OSError as e:
+            logging.error(f"Refusing render cache directory, using memory: {e}")
+    elif kind != 'memory':
+        logging.warning(f"Unknown render cache backend {kind!r}, using memory")
+    return RenderCache(MemoryBackend(max_entries, ttl))
@@ -0,0 +1,272 @@
+import csv
+import io
+import math
+import numbers
+import zipfile
+from xml.sax.saxutils import escape, quoteattr
+
+from calculator import SCENARIO_DEFINITIONS, RealEstateCalculator
+from input_decoder import DEFAULT_CHUNK_SIZE, iter_listing_chunks
+from market_data import get_market_index
+
+EXPORT_CHUNK_SIZE = 64 * 1024
+MAX_SHEET_ROWS = 1048576
+
+METRIC_KEYS = ['notary_fees', 'total_investment', 'annual_gross_income', 'annual_net_income',
+               'net_yield', 'cap_rate', 'monthly_cash_flow', 'monthly_loan_payment',
+               'npv_3', 'npv_5', 'npv_10', 'irr', 'dscr', 'breakeven_rent']
+CASH_FLOW_KEYS = ['year', 'gross_income', 'operating_expenses', 'loan_payment',
+                  'net_cash_flow', 'remaining_principal', 'npv']
+AMORTIZATION_KEYS = ['month', 'payment', 'interest', 'principal', 'remaining_principal']
+SCENARIO_KEYS = ['net_yield', 'monthly_cash_flow', 'npv_10', 'irr', 'dscr', 'breakeven_rent']
+
+SECTIONS = ['metrics', 'scenarios', 'cash_flow', 'amortization', 'errors']
+
+_XML_HEAD = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+_SHEET_HEAD = (_XML_HEAD + '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+               '<sheetData>').encode()
+_SHEET_TAIL = b'</sheetData></worksheet>'
+_RELATIONSHIP = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+_INVALID_XML = dict.fromkeys(c for c in range(32) if c not in (9, 10, 13))
+
+
+def _cell_value(value):
+    if isinstance(value, bool) or not isinstance(value, numbers.Real):
+        return value
+    if isinstance(value, numbers.Integral):
+        return int(value)
+    value = float(value)
+    return round(value, 4) if math.isfinite(value) else None
+
+
+def metrics_rows(properties):
+    for reference, calculator, extra in properties:
+        metrics = extra.get('metrics') or calculator.calculate_all_metrics()
+        yield [reference] + [metrics[key] for key in METRIC_KEYS] + [extra.get('market_rent')]
+
+
+def scenario_rows(properties):
+    for reference, calculator, _ in properties:
+        for scenario, evaluated in calculator.calculate_scenarios(SCENARIO_DEFINITIONS, interpretations=False).items():
+            yield [reference, scenario] + [evaluated['results'][key] for key in SCENARIO_KEYS]
+
+
+def cash_flow_rows(properties):
+    for reference, calculator, _ in properties:
+        for year in calculator.calculate_yearly_schedule():
+            yield [reference] + [year[key] for key in CASH_FLOW_KEYS]
+
+
+def amortization_rows(properties):
+    for reference, calculator, _ in properties:
+        for month in calculator.calculate_amortization_schedule():
+            yield [reference] + [month[key] for key in AMORTIZATION_KEYS]
+
+
+# Section -> (header keys, row builder); 'errors' rows come from the decoder instead.
+SECTION_TABLES = {
+    'metrics': (['reference'] + METRIC_KEYS + ['market_rent'], metrics_rows),
+    'scenarios': (['reference', 'scenario'] + SCENARIO_KEYS, scenario_rows),
+    'cash_flow': (['reference'] + CASH_FLOW_KEYS, cash_flow_rows),
+    'amortization': (['reference'] + AMORTIZATION_KEYS, amortization_rows),
+    'errors': (['row', 'field', 'value'], None),
+}
+
+
+def _listing_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield (chunk, properties, failures) per decoded chunk of a listing file.
+
+    Every valid row is calculated here, before any sheet is written, so a row
+    the calculator rejects becomes a [row, 'calculation', message] failure
+    instead of an exception in the middle of a streamed download.
+    """
+    market = get_market_index()
+    for chunk in iter_listing_chunks(path, chunk_size=chunk_size):
+        references = chunk.columns['reference']
+        market_rents = None
+        if market is not None:
+            market_rents = market.comparable_rents(chunk.columns['arrondissement'],
+                                                   chunk.columns['surface'],
+                                                   chunk.columns['quartier'])
+        properties, failures = [], []
+        for row, kwargs in chunk.records():
+            offset = row - chunk.start_row
+            calculator = RealEstateCalculator(**kwargs)
+            try:
+                metrics = calculator.calculate_all_metrics()
+            except Exception as e:
+                failures.append([row, 'calculation', str(e) or type(e).__name__])
+                continue
+            market_rent = market_rents[offset] if market_rents is not None else math.nan
+            properties.append((references[offset] or row, calculator,
+                               {'market_rent': float(market_rent) if market_rent > 0 else None,
+                                'metrics': metrics}))
+        yield chunk, properties, failures
+
+
+def listing_properties(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield (reference, calculator, extra) for every row that decodes and calculates cleanly."""
+    for _, properties, _ in _listing_chunks(path, chunk_size):
+        yield from properties
+
+
+def listing_errors(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    for chunk, _, failures in _listing_chunks(path, chunk_size):
+        errors = [list(error) for error in chunk.errors] + failures
+        errors.sort(key=lambda error: error[:2])
+        yield from errors
+
+
+def section_rows(section, properties, errors=None):
+    """Return (header keys, rows) for section; properties and errors are zero-argument factories."""
+    header, builder = SECTION_TABLES[section]
+    if builder is None:
+        return header, errors() if errors is not None else iter(())
+    return header, builder(properties())
+
+
+class _StreamBuffer:
+    """Write-only sink that zipfile/csv write into and the response generator drains."""
+
+    def __init__(self):
+        self._chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        self.size = 0
+        return data
+
+
+def stream_csv(header, rows, chunk_size=EXPORT_CHUNK_SIZE):
+    text = io.StringIO()
+    writer = csv.writer(text)
+    # BOM so Excel opens accented and Arabic headers as UTF-8.
+    text.write('\ufeff')
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow(['' if value is None else value for value in map(_cell_value, row)])
+        if text.tell() >= chunk_size:
+            yield text.getvalue().encode('utf-8')
+            text.seek(0)
+            text.truncate()
+    yield text.getvalue().encode('utf-8')
+
+
+def _column_letter(index):
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _row_xml(row_number, values):
+    cells = []
+    for index, value in enumerate(values):
+        value = _cell_value(value)
+        if value is None or value == '':
+            continue
+        ref = f'{_column_letter(index)}{row_number}'
+        if isinstance(value, bool):
+            cells.append(f'<c r="{ref}" t="b"><v>{int(value)}</v></c>')
+        elif isinstance(value, (int, float)):
+            cells.append(f'<c r="{ref}"><v>{value!r}</v></c>')
+        else:
+            text = escape(str(value).translate(_INVALID_XML))
+            cells.append(f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+    return f'<row r="{row_number}">{"".join(cells)}</row>'.encode()
+
+
+def _workbook_parts(sheet_names):
+    sheets = ''.join(f'<sheet name={quoteattr(name)} sheetId="{i}" r:id="rId{i}"/>'
+                     for i, name in enumerate(sheet_names, 1))
+    workbook = (_XML_HEAD + '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+                f'xmlns:r="{_RELATIONSHIP}"><sheets>{sheets}</sheets></workbook>')
+    sheet_rels = ''.join(f'<Relationship Id="rId{i}" Type="{_RELATIONSHIP}/worksheet" '
+                         f'Target="worksheets/sheet{i}.xml"/>' for i in range(1, len(sheet_names) + 1))
+    workbook_rels = (_XML_HEAD + '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                     f'{sheet_rels}</Relationships>')
+    root_rels = (_XML_HEAD + '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                 f'<Relationship Id="rId1" Type="{_RELATIONSHIP}/officeDocument" Target="xl/workbook.xml"/>'
+                 '</Relationships>')
+    overrides = ''.join(f'<Override PartName="/xl/worksheets/sheet{i}.xml" ContentType="application/'
+                        'vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                        for i in range(1, len(sheet_names) + 1))
+    content_types = (_XML_HEAD + '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                     '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                     '<Default Extension="xml" ContentType="application/xml"/>'
+                     '<Override PartName="/xl/workbook.xml" ContentType="application/'
+                     'vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+                     f'{overrides}</Types>')
+    return [('xl/workbook.xml', workbook),
+            ('xl/_rels/workbook.xml.rels', workbook_rels),
+            ('_rels/.rels', root_rels),
+            ('[Content_Types].xml', content_types)]
+
+
+def stream_xlsx(sheets, chunk_size=EXPORT_CHUNK_SIZE):
+    """Stream an XLSX workbook from (name, header, rows) sheets without holding it in memory.
+
+    Sheets longer than Excel's row limit continue on 'name 2', 'name 3', ...; the
+    workbook index is written last since the final sheet list is only known then.
+    """
+    buffer = _StreamBuffer()
+    sheet_names = []
+    end = object()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as workbook:
+        for name, header, rows in sheets:
+            rows = iter(rows)
+            pending = next(rows, end)
+            part = 0
+            while part == 0 or pending is not end:
+                part += 1
+                sheet_names.append(name[:31] if part == 1 else f'{name[:27]} {part}')
+                with workbook.open(f'xl/worksheets/sheet{len(sheet_names)}.xml', 'w', force_zip64=True) as entry:
+                    entry.write(_SHEET_HEAD)
+                    entry.write(_row_xml(1, header))
+                    row_number = 1
+                    while pending is not end and row_number < MAX_SHEET_ROWS:
+                        row_number += 1
+                        entry.write(_row_xml(row_number, pending))
+                        pending = next(rows, end)
+                        if buffer.size >= chunk_size:
+                            yield buffer.drain()
+                    entry.write(_SHEET_TAIL)
+        for part_name, xml in _workbook_parts(sheet_names):
+            workbook.writestr(part_name, xml)
+    yield buffer.drain()
+
+
+def stream_export(fmt, translations, properties, errors=None, section='metrics'):
+    """Stream an analysis export as bytes chunks.
+
+    properties (and errors, for batch imports) are zero-argument callables
+    returning fresh iterators, so each sheet re-reads its source instead of
+    keeping results in memory. CSV holds a single section; XLSX holds all of them.
+    """
+    def labels(keys):
+        return [translations.get(key, key) for key in keys]
+
+    if fmt == 'csv':
+        header, rows = section_rows(section, properties, errors)
+        return stream_csv(labels(header), rows)
+
+    sheets = []
+    for name in SECTIONS:
+        if name == 'errors' and errors is None:
+            continue
+        # Row builders are generators, so a sheet only reads its source once it is being written.
+        header, rows = section_rows(name, properties, errors)
+        sheets.append((translations.get(f'sheet_{name}', name), labels(header), rows))
+    return stream_xlsx(sheets)
@@ -11,7 +11,7 @@ document.addEventListener('DOMContentLoaded', function() {
     });
     
     // Add form validation
-    const form = document.querySelector('form');
+    const form = getCalculatorForm();
     if (form) {
         form.addEventListener('submit', validateForm);
     }
@@ -28,6 +28,11 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 });
 
+// The batch import form shares the page, so only the calculator form is targeted
+function getCalculatorForm() {
+    return document.querySelector('form:not(#batch-form)');
+}
+
 function toggleLoanFields() {
     const useLoanYes = document.getElementById('loan_yes');
     const loanFields = document.getElementById('loan-fields');
@@ -129,7 +134,7 @@ function showError(message) {
     alert.innerHTML = `<i class="fas fa-exclamation-triangle"></i> ${message}`;
     
     // Insert at the top of the form
-    const form = document.querySelector('form');
+    const form = getCalculatorForm();
     if (form) {
         form.insertBefore(alert, form.firstChild);
     }
@@ -186,7 +191,7 @@ if (document.querySelector('.results-card')) {
 document.addEventListener('keydown', function(event) {
     // Ctrl/Cmd + Enter to submit form
     if ((event.ctrlKey || event.metaKey) && event.key === 'Enter') {
-        const form = document.querySelector('form');
+        const form = getCalculatorForm();
         if (form) {
             form.submit();
         }
@@ -194,7 +199,7 @@ document.addEventListener('keydown', function(event) {
     
     // Escape to clear form
     if (event.key === 'Escape') {
-        const form = document.querySelector('form');
+        const form = getCalculatorForm();
         if (form && confirm('Voulez-vous vraiment effacer le formulaire?')) {
             form.reset();
             toggleLoanFields();
@@ -229,14 +234,42 @@ document.querySelectorAll('.metric-value').forEach(element => {
     });
 });
 
-// Auto-submit form when scenario changes
+// Every scenario is computed by /calculate, so switching only swaps the displayed values
+let scenarioData = null;
+
+function showScenario(name) {
+    if (scenarioData === null) {
+        const payload = document.getElementById('scenario-data');
+        scenarioData = payload ? JSON.parse(payload.textContent) : {};
+    }
+    const scenario = scenarioData[name];
+    if (!scenario) {
+        return false;
+    }
+
+    document.querySelectorAll('[data-metric]').forEach(element => {
+        const value = scenario.metrics[element.dataset.metric];
+        if (value !== undefined) {
+            element.textContent = value;
+        }
+    });
+
+    const interpretations = document.getElementById('interpretations');
+    if (interpretations) {
+        interpretations.innerHTML = '';
+        scenario.interpretations.forEach(([symbol, text]) => {
+            const item = document.createElement('li');
+            item.textContent = `${symbol} ${text}`;
+            interpretations.appendChild(item);
+        });
+    }
+    return true;
+}
+
 document.querySelectorAll('input[name="scenario"]').forEach(radio => {
     radio.addEventListener('change', function() {
-        if (document.querySelector('.results-card')) {
-            // Only auto-submit if we already have results
-            setTimeout(() => {
-                document.querySelector('form').submit();
-            }, 100);
+        if (showScenario(this.value)) {
+            animateMetrics();
         }
     });
 });
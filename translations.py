@@ -44,6 +44,7 @@ def get_translations(language='fr'):
             'cfa_analysis': 'Analyse CFA - Conseil Professionnel',
             'toggle_language': 'عربي',
             'error_invalid_input': 'Erreur: Veuillez vérifier vos données d\'entrée.',
+            'error_invalid_fields': 'Erreur: Valeurs illisibles pour : {fields}',
             'dscr': 'DSCR (Ratio de Couverture)',
             'breakeven_rent': 'Loyer Minimum Rentabilité Nette',
             'scenario_analysis': 'Analyse de Scénarios',
@@ -54,7 +55,36 @@ def get_translations(language='fr'):
             'export_pdf': 'Exporter PDF',
             'scenario_toggle': 'Basculer Scénario',
             'annual_rent_increase': 'Augmentation Loyer Annuelle (%)',
-            'annual_charges_increase': 'Augmentation Charges Annuelle (%)'
+            'annual_charges_increase': 'Augmentation Charges Annuelle (%)',
+            'arrondissement': 'Arrondissement',
+            'surface': 'Surface (m²)',
+            'market_warnings': 'Comparaison Marché',
+            'market_outlier': '{label} : {value:,.0f} € s\'écarte fortement de la référence marché ({reference:,.0f} €)',
+            'export_xlsx': 'Exporter Excel',
+            'export_csv': 'Exporter CSV',
+            'import_listings': 'Analyse en lot (CSV/XLSX)',
+            'sheet_metrics': 'Indicateurs',
+            'sheet_scenarios': 'Scénarios',
+            'sheet_cash_flow': 'Flux annuels',
+            'sheet_amortization': 'Amortissement',
+            'sheet_errors': 'Erreurs',
+            'reference': 'Référence',
+            'market_rent': 'Loyer de Marché (€)',
+            'scenario': 'Scénario',
+            'year': 'Année',
+            'month': 'Mois',
+            'gross_income': 'Revenus Bruts',
+            'operating_expenses': 'Charges d\'Exploitation',
+            'loan_payment': 'Remboursement Prêt',
+            'net_cash_flow': 'Cash-Flow Net',
+            'remaining_principal': 'Capital Restant Dû',
+            'npv': 'VAN Cumulée',
+            'payment': 'Mensualité',
+            'interest': 'Intérêts',
+            'principal': 'Capital Remboursé',
+            'row': 'Ligne',
+            'field': 'Champ',
+            'value': 'Valeur'
         },
         'ar': {
             'title': 'حاسبة الاستثمار العقاري',
@@ -98,6 +128,7 @@ def get_translations(language='fr'):
             'cfa_analysis': 'تحليل CFA - استشارة مهنية',
             'toggle_language': 'Français',
             'error_invalid_input': 'خطأ: يرجى التحقق من بيانات الإدخال الخاصة بك.',
+            'error_invalid_fields': 'خطأ: قيم غير مقروءة في: {fields}',
             'dscr': 'نسبة تغطية خدمة الدين',
             'breakeven_rent': 'الحد الأدنى للإيجار للربحية الصافية',
             'scenario_analysis': 'تحليل السيناريوهات',
@@ -108,7 +139,36 @@ def get_translations(language='fr'):
             'export_pdf': 'تصدير PDF',
             'scenario_toggle': 'تبديل السيناريو',
             'annual_rent_increase': 'الزيادة السنوية للإيجار (%)',
-            'annual_charges_increase': 'الزيادة السنوية للرسوم (%)'
+            'annual_charges_increase': 'الزيادة السنوية للرسوم (%)',
+            'arrondissement': 'الدائرة',
+            'surface': 'المساحة (م²)',
+            'market_warnings': 'مقارنة بالسوق',
+            'market_outlier': '{label}: {value:,.0f} € يختلف كثيراً عن مرجع السوق ({reference:,.0f} €)',
+            'export_xlsx': 'تصدير Excel',
+            'export_csv': 'تصدير CSV',
+            'import_listings': 'تحليل جماعي (CSV/XLSX)',
+            'sheet_metrics': 'المؤشرات',
+            'sheet_scenarios': 'السيناريوهات',
+            'sheet_cash_flow': 'التدفقات السنوية',
+            'sheet_amortization': 'جدول الاستهلاك',
+            'sheet_errors': 'الأخطاء',
+            'reference': 'المرجع',
+            'market_rent': 'إيجار السوق (€)',
+            'scenario': 'السيناريو',
+            'year': 'السنة',
+            'month': 'الشهر',
+            'gross_income': 'الدخل الإجمالي',
+            'operating_expenses': 'مصاريف التشغيل',
+            'loan_payment': 'سداد القرض',
+            'net_cash_flow': 'التدفق النقدي الصافي',
+            'remaining_principal': 'رأس المال المتبقي',
+            'npv': 'القيمة الحالية الصافية التراكمية',
+            'payment': 'القسط',
+            'interest': 'الفوائد',
+            'principal': 'رأس المال المسدد',
+            'row': 'السطر',
+            'field': 'الحقل',
+            'value': 'القيمة'
         }
     }
     